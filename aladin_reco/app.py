@@ -12,13 +12,28 @@
 
 import streamlit as st
 import requests
-import xml.etree.ElementTree as ET
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+from urllib3.util.retry import Retry
+try:
+    # lxml이 설치되어 있으면 더 빠른 C 기반 파서를 사용합니다.
+    from lxml import etree as ET
+    XMLParseError = ET.XMLSyntaxError
+except ImportError:
+    import xml.etree.ElementTree as ET
+    XMLParseError = ET.ParseError
 import google.generativeai as genai
-import time
 import base64
+import difflib
+import hashlib
+import io
 import os
+import re
+import threading
 import logging
-from typing import List, Dict, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+from typing import List, Dict, Optional, Any, Iterator, Union
 
 # --- 1. 기본 설정: 로깅 및 환경 변수 ---
 
@@ -48,9 +63,13 @@ CONFIG = {
     "aladin": {
         "search_url": "http://www.aladin.co.kr/ttb/api/ItemSearch.aspx",
         "lookup_url": "http://www.aladin.co.kr/ttb/api/ItemLookUp.aspx",
+        "timeout": (2.0, 4.0),  # (연결, 수신 대기) 타임아웃(초) - 호출 전체 시간 제한이 아님
+        "lookup_batch_size": 10,  # 상품 조회 API 한 번에 묶어 보낼 최대 ISBN 수
     },
     "gemini": {
         "model": "gemini-2.0-flash",
+        "cache_max_entries": 1024,  # 프롬프트 해시별로 보관할 최대 응답 수
+        "cache_ttl": 86400,  # 응답 캐시 유효기간(초)
         "prompt": """당신은 사용자의 상황과 감정을 깊이 이해하고 공감해주는 전문 북 큐레이터입니다.
 사용자의 요청: "{user_query}"
 
@@ -68,64 +87,217 @@ CONFIG = {
     }
 }
 
+# 알라딘 API 응답 XML의 기본 네임스페이스 (Clark 표기법 태그 접두사)
+NS = '{http://www.aladin.co.kr/ttb/apiguide.aspx}'
+
+# 자주 조회하는 태그는 네임스페이스가 붙은 이름으로 미리 만들어 둡니다.
+TAG_ITEM = f'{NS}item'
+TAG_TITLE = f'{NS}title'
+TAG_AUTHOR = f'{NS}author'
+TAG_DESCRIPTION = f'{NS}description'
+TAG_COVER = f'{NS}cover'
+TAG_ISBN13 = f'{NS}isbn13'
+TAG_CUSTOMER_REVIEW_RANK = f'{NS}customerReviewRank'
+TAG_RATING_SCORE = f'{NS}subInfo/{NS}ratingInfo/{NS}ratingScore'
+
+# 알라딘 API 호출용 공유 세션: 커넥션 풀을 재사용하여 요청마다 TCP 연결을 새로 맺지 않습니다.
+_session = requests.Session()
+# 일시적인 연결 실패나 5xx 응답은 한 번만 재시도합니다.
+# CONFIG의 timeout (2.0, 4.0)은 연결 수립 시간과 데이터 수신 사이의 대기(유휴) 시간을 각각 제한할 뿐,
+# 호출 전체 시간을 제한하지는 않습니다. 서버가 조금씩 계속 보내면 호출은 그보다 오래 걸릴 수 있습니다.
+_session.mount('http://', HTTPAdapter(
+    pool_connections=16, pool_maxsize=32,
+    max_retries=Retry(total=1, connect=1, read=1, status_forcelist=[500, 502, 503, 504],
+                      backoff_factor=0.3, allowed_methods=['GET']),
+))
+
 # --- 3. API 호출 및 데이터 처리 함수 ---
 
+class _LockedTTLCache:
+    """
+    여러 세션(스레드)이 함께 쓰는 크기·유효기간 제한 캐시입니다. (cachetools.TTLCache + Lock)
+
+    st.cache_data와 달리 값을 직접 넣을 수 있어, 성공한 결과만 골라 저장하거나 여러 경로에서 같은 캐시를 채울 때 사용합니다.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key: Any, value: Any):
+        with self._lock:
+            self._cache[key] = value
+
+def _is_timeout(e: requests.exceptions.RequestException) -> bool:
+    """
+    요청 예외가 시간 초과로 인한 것인지 판별합니다.
+
+    읽기 시간 초과는 requests.Timeout이 아니라 ConnectionError로 전달되는 경우가 있어 함께 확인합니다.
+    - 재시도가 모두 소진된 경우: ReadTimeoutError를 원인(reason)으로 가진 MaxRetryError를 감쌉니다.
+    - 헤더 수신 후 본문을 받는 중 멈춘 경우: ReadTimeoutError를 직접 감쌉니다. (재시도 대상이 아님)
+    """
+    if isinstance(e, requests.exceptions.Timeout):
+        return True
+    cause = e.args[0] if e.args else None
+    if isinstance(cause, MaxRetryError):
+        cause = cause.reason
+    return isinstance(cause, ReadTimeoutError)
+
+def _iter_items(content: bytes) -> Iterator[Any]:
+    """
+    알라딘 응답 XML을 스트리밍 파싱하여 <item> 요소를 하나씩 반환합니다.
+
+    전체 트리를 만들지 않고, 반환된 요소는 다음 요소로 넘어갈 때 비워(clear) 메모리를 해제합니다.
+    따라서 필요한 값은 반복문 안에서 바로 꺼내 사용해야 합니다.
+    """
+    for _, elem in ET.iterparse(io.BytesIO(content), events=('end',)):
+        if elem.tag == TAG_ITEM:
+            yield elem
+            elem.clear()
+
+def _find_text(elem: Any, tag: str, default: Optional[str] = None) -> Optional[str]:
+    """하위 요소를 한 번만 조회하여 텍스트를 반환하고, 요소가 없으면 기본값을 반환합니다."""
+    child = elem.find(tag)
+    return child.text if child is not None else default
+
+def _parse_star_rating(item: Any) -> str:
+    """상품 조회 API의 <item> 요소에서 별점(평점 또는 고객 리뷰 점수) 문자열을 만듭니다."""
+    score = _find_text(item, TAG_RATING_SCORE)
+    if score and float(score) > 0:
+        return f"{score} / 10.0"
+
+    review_rank = _find_text(item, TAG_CUSTOMER_REVIEW_RANK)
+    if review_rank and int(review_rank) > 0:
+        return f"{int(review_rank)} / 10"
+
+    return "별점 정보 없음"
+
+@st.cache_resource(show_spinner=False)
+def _get_book_detail_cache() -> _LockedTTLCache:
+    """책별 상세 정보(별점, 큰 표지)를 보관하는 공용 캐시를 반환합니다. (Streamlit 리소스 캐시 적용)"""
+    return _LockedTTLCache(maxsize=4096, ttl=3600)
+
 def get_book_detail(item_id: str, item_id_type: str = 'ISBN13') -> Optional[Dict[str, str]]:
     """
-    알라딘 상품 조회 API로 특정 책의 별점 정보를 가져옵니다.
+    알라딘 상품 조회 API로 특정 책의 별점과 큰 표지(MidBig) 이미지 URL을 가져옵니다.
+
+    조회에 성공한 결과만 1시간 동안 캐시합니다. 실패는 캐시하지 않으므로 다음 요청에서 다시 조회합니다.
 
     Args:
         item_id (str): 조회할 상품의 ID (ISBN, ISBN13 등).
         item_id_type (str): 상품 ID의 종류.
 
     Returns:
-        Optional[Dict[str, str]]: 별점 정보가 담긴 딕셔너리 또는 실패 시 None.
+        Optional[Dict[str, str]]: 별점(star_rating)과 표지 URL(cover_url)이 담긴 딕셔너리 또는 실패 시 None.
     """
+    cache = _get_book_detail_cache()
+    cached = cache.get((item_id_type, item_id))
+    if cached is not None:
+        return cached
+
     params = {
         'ttbkey': ALADIN_TTBKEY,
         'itemId': item_id,
         'ItemIdType': item_id_type,
         'output': 'xml',
         'Version': '20131101',
-        'OptResult': 'ratingInfo'
+        'OptResult': 'ratingInfo',
+        'Cover': 'MidBig'
     }
     try:
-        response = requests.get(CONFIG["aladin"]["lookup_url"], params=params)
+        response = _session.get(CONFIG["aladin"]["lookup_url"], params=params, timeout=CONFIG["aladin"]["timeout"])
         response.raise_for_status()
-        response.encoding = 'utf-8'
-        root = ET.fromstring(response.text)
-        ns = {'': 'http://www.aladin.co.kr/ttb/apiguide.aspx'}
-        item = root.find('item', ns)
+        item = next(_iter_items(response.content), None)
         
         if item is None:
             return None
 
-        star_rating = "별점 정보 없음"
-        sub_info = item.find('subInfo', ns)
-        if sub_info is not None:
-            rating_info = sub_info.find('ratingInfo', ns)
-            if rating_info is not None:
-                score_elem = rating_info.find('ratingScore', ns)
-                if score_elem is not None and score_elem.text and float(score_elem.text) > 0:
-                    star_rating = f"{score_elem.text} / 10.0"
-                    return {'star_rating': star_rating}
-        
-        review_rank_elem = item.find('customerReviewRank', ns)
-        if review_rank_elem is not None and review_rank_elem.text and int(review_rank_elem.text) > 0:
-            star_rating = f"{int(review_rank_elem.text)} / 10"
-        
-        return {'star_rating': star_rating}
+        details = {'star_rating': _parse_star_rating(item), 'cover_url': _find_text(item, TAG_COVER)}
+        cache.set((item_id_type, item_id), details)
+        return details
 
     except requests.exceptions.RequestException as e:
-        logging.warning(f"알라딘 상세 정보 조회 실패 (ItemID: {item_id}): {e}")
+        if _is_timeout(e):
+            logging.warning(f"알라딘 상세 정보 조회 시간 초과 (ItemID: {item_id}): {e}")
+        else:
+            logging.warning(f"알라딘 상세 정보 조회 실패 (ItemID: {item_id}): {e}")
         return None
-    except ET.ParseError as e:
+    except XMLParseError as e:
         logging.warning(f"알라딘 상세 정보 XML 파싱 실패 (ItemID: {item_id}): {e}")
         return None
 
-def search_books_by_title(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+def get_book_details_bulk(isbns: List[str]) -> Dict[str, Dict[str, str]]:
     """
-    알라딘 API로 책을 검색하여 상세 정보가 포함된 리스트로 반환합니다.
+    여러 ISBN13의 별점과 큰 표지 정보를 상품 조회 API 요청 하나로 묶어 가져옵니다.
+
+    책별 캐시에 있는 ISBN은 바로 사용하고, 나머지만 쉼표로 연결하여 `lookup_batch_size` 단위로 요청합니다.
+    묶음 응답의 결과는 책별 캐시에도 저장합니다. 정상 응답에서 빠진 ISBN만 get_book_detail 단건 조회(병렬)로 보완하며,
+    요청 자체가 실패한 묶음은 같은 서버에 단건 요청을 반복하지 않습니다.
+
+    Args:
+        isbns (List[str]): 조회할 ISBN13 리스트.
+
+    Returns:
+        Dict[str, Dict[str, str]]: ISBN13을 키로, get_book_detail과 같은 형태의 상세 정보 딕셔너리를 값으로 하는 딕셔너리.
+    """
+    cache = _get_book_detail_cache()
+    details_by_isbn: Dict[str, Dict[str, str]] = {}
+    misses = []
+    for isbn in isbns:
+        cached = cache.get(('ISBN13', isbn))
+        if cached is not None:
+            details_by_isbn[isbn] = cached
+        else:
+            misses.append(isbn)
+
+    missing = []
+    batch_size = CONFIG["aladin"]["lookup_batch_size"]
+    for start in range(0, len(misses), batch_size):
+        batch = misses[start:start + batch_size]
+        params = {
+            'ttbkey': ALADIN_TTBKEY,
+            'ItemId': ",".join(batch),
+            'ItemIdType': 'ISBN13',
+            'output': 'xml',
+            'Version': '20131101',
+            'OptResult': 'ratingInfo',
+            'Cover': 'MidBig'
+        }
+        try:
+            response = _session.get(CONFIG["aladin"]["lookup_url"], params=params, timeout=CONFIG["aladin"]["timeout"])
+            response.raise_for_status()
+            for item in _iter_items(response.content):
+                isbn13 = _find_text(item, TAG_ISBN13)
+                if isbn13:
+                    details = {'star_rating': _parse_star_rating(item), 'cover_url': _find_text(item, TAG_COVER)}
+                    cache.set(('ISBN13', isbn13), details)
+                    details_by_isbn[isbn13] = details
+        except requests.exceptions.RequestException as e:
+            if _is_timeout(e):
+                logging.warning(f"알라딘 상세 정보 일괄 조회 시간 초과 (ItemIDs: {batch}): {e}")
+            else:
+                logging.warning(f"알라딘 상세 정보 일괄 조회 실패 (ItemIDs: {batch}): {e}")
+            continue
+        except XMLParseError as e:
+            logging.warning(f"알라딘 상세 정보 일괄 조회 XML 파싱 실패 (ItemIDs: {batch}): {e}")
+            continue
+        missing.extend(isbn for isbn in batch if isbn not in details_by_isbn)
+
+    # 묶음 응답에서 누락된 책은 네트워크 대기가 대부분이므로 스레드로 병렬 조회합니다.
+    if missing:
+        with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+            for isbn, details in zip(missing, executor.map(get_book_detail, missing)):
+                if details:
+                    details_by_isbn[isbn] = details
+    return details_by_isbn
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _search_books(query: str, max_results: int) -> List[Dict[str, Any]]:
+    """
+    알라딘 검색 API로 책 목록(별점 제외)을 가져옵니다. (Streamlit 캐시 적용)
 
     Args:
         query (str): 검색할 키워드.
@@ -140,112 +312,279 @@ def search_books_by_title(query: str, max_results: int = 5) -> List[Dict[str, An
     logging.info(f"'{query}'에 대한 알라딘 책 검색을 시작합니다.")
     params = {
         'ttbkey': ALADIN_TTBKEY, 'QueryType': 'Keyword', 'MaxResults': str(max_results),
-        'SearchTarget': 'Book', 'output': 'xml', 'Query': query, 'Version': '20131101', 'Cover': 'MidBig'
+        'SearchTarget': 'Book', 'output': 'xml', 'Query': query, 'Version': '20131101', 'Cover': 'Small'
     }
     try:
-        response = requests.get(CONFIG["aladin"]["search_url"], params=params)
+        response = _session.get(CONFIG["aladin"]["search_url"], params=params, timeout=CONFIG["aladin"]["timeout"])
         response.raise_for_status()
-        response.encoding = 'utf-8'
-        root = ET.fromstring(response.text)
-        ns = {'': 'http://www.aladin.co.kr/ttb/apiguide.aspx'}
-        items = root.findall('item', ns)
-
-        if not items:
-            logging.warning(f"'{query}'에 대한 검색 결과가 없습니다.")
-            return []
-
         book_list = []
-        for item in items:
-            isbn13 = item.find('isbn13', ns).text if item.find('isbn13', ns) is not None else None
-            star_rating = "별점 정보 없음"
-            if isbn13:
-                details = get_book_detail(isbn13)
-                if details:
-                    star_rating = details.get('star_rating', '별점 정보 없음')
-            
+        for item in _iter_items(response.content):
             book_list.append({
-                'title': item.find('title', ns).text if item.find('title', ns) is not None else "제목 없음",
-                'author': item.find('author', ns).text if item.find('author', ns) is not None else "저자 없음",
-                'description': item.find('description', ns).text if item.find('description', ns) is not None else "설명 없음",
-                'cover_url': item.find('cover', ns).text,
-                'star_rating': star_rating,
+                'title': _find_text(item, TAG_TITLE, "제목 없음"),
+                'author': _find_text(item, TAG_AUTHOR, "저자 없음"),
+                'description': _find_text(item, TAG_DESCRIPTION, "설명 없음"),
+                'cover_url': _find_text(item, TAG_COVER),
+                'isbn13': _find_text(item, TAG_ISBN13),
+                'star_rating': "별점 정보 없음",
             })
-        logging.info(f"총 {len(book_list)}권의 책을 찾았습니다.")
+
+        if not book_list:
+            logging.warning(f"'{query}'에 대한 검색 결과가 없습니다.")
         return book_list
 
     except requests.exceptions.RequestException as e:
+        if _is_timeout(e):
+            logging.error(f"알라딘 API 요청 시간이 초과되었습니다: {e}")
+            raise BookSearchError(f"알라딘 서버의 응답이 지연되고 있습니다. 잠시 후 다시 시도해주세요: {e}")
         logging.exception("알라딘 API 요청 중 네트워크 오류가 발생했습니다.")
         raise BookSearchError(f"알라딘 서버와 통신 중 오류가 발생했습니다: {e}")
-    except ET.ParseError as e:
+    except XMLParseError as e:
         logging.exception("알라딘 API 응답 XML 파싱 중 오류가 발생했습니다.")
         raise BookSearchError(f"알라딘 서버의 응답을 처리하는 데 실패했습니다: {e}")
 
-def get_gemini_recommendation(user_query: str, book_list: List[Dict[str, Any]]) -> str:
+def search_books_by_title(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+    """
+    알라딘 API로 책을 검색하여 상세 정보가 포함된 리스트로 반환합니다.
+
+    검색 결과 목록만 10분 동안 캐시하고, 별점과 큰 표지는 책별 캐시를 거쳐 매번 붙입니다.
+    따라서 일시적인 별점 조회 실패가 검색 결과 캐시에 남지 않습니다.
+
+    Args:
+        query (str): 검색할 키워드.
+        max_results (int): 최대 검색 결과 수.
+
+    Returns:
+        List[Dict[str, Any]]: 검색된 책 정보 딕셔너리의 리스트.
+    
+    Raises:
+        BookSearchError: API 호출 또는 데이터 처리 중 오류 발생 시.
+    """
+    book_list = _search_books(query, max_results)
+    if not book_list:
+        return []
+
+    details_by_isbn = get_book_details_bulk([book['isbn13'] for book in book_list if book['isbn13']])
+    for book in book_list:
+        details = details_by_isbn.get(book['isbn13'])
+        if details:
+            book['star_rating'] = details['star_rating']
+            # 검색 단계에서는 작은 표지만 받으므로, 상세 조회에서 받은 큰 표지가 있으면 교체합니다.
+            book['cover_url'] = details.get('cover_url') or book['cover_url']
+    logging.info(f"총 {len(book_list)}권의 책을 찾았습니다.")
+    return book_list
+
+@st.cache_resource(show_spinner=False)
+def _get_gemini_model(name: str) -> genai.GenerativeModel:
+    """Gemini 모델 객체를 생성하여 재사용합니다. (Streamlit 리소스 캐시 적용)"""
+    return genai.GenerativeModel(name)
+
+@st.cache_resource(show_spinner=False)
+def _get_recommendation_cache() -> _LockedTTLCache:
+    """
+    프롬프트 해시를 키로 Gemini 응답 텍스트를 보관하는 공용 캐시를 반환합니다. (Streamlit 리소스 캐시 적용)
+
+    스트리밍 응답은 st.cache_data로 감쌀 수 없으므로, 일반/스트리밍 호출이 함께 쓰는 캐시로 관리합니다.
+    """
+    return _LockedTTLCache(maxsize=CONFIG["gemini"]["cache_max_entries"], ttl=CONFIG["gemini"]["cache_ttl"])
+
+def _cache_recommendation(prompt_hash: str, text: str):
+    """
+    추천 도서 제목을 파싱할 수 있는 Gemini 응답만 캐시에 저장합니다.
+
+    빈 응답이나 '추천 도서:' 줄이 없는 응답은 저장하지 않으므로, 사용자가 다시 요청하면 새로 생성합니다.
+    """
+    if parse_recommended_book_title(text):
+        _get_recommendation_cache().set(prompt_hash, text)
+    else:
+        logging.warning("추천 도서 제목이 없는 Gemini 응답은 캐시하지 않습니다.")
+
+def _response_text(response: Any) -> str:
+    """
+    Gemini 응답(또는 스트리밍 조각)에서 텍스트를 꺼냅니다.
+
+    파트가 하나뿐인 일반적인 경우에는 response.text 속성의 파트 순회·검사 과정을 거치지 않고 바로 읽습니다.
+    SDK의 응답 구조가 달라 직접 읽을 수 없으면 response.text로 대체합니다.
+    """
+    try:
+        parts = response.candidates[0].content.parts
+        if len(parts) == 1:
+            return parts[0].text
+    except (AttributeError, IndexError, TypeError):
+        pass
+    return response.text
+
+def _stream_recommendation(prompt_hash: str, prompt: str) -> Iterator[str]:
+    """
+    Gemini 응답을 스트리밍으로 받아 텍스트 조각을 순서대로 반환합니다.
+
+    캐시에 같은 프롬프트의 응답이 있으면 API를 호출하지 않고 전체 텍스트를 한 번에 반환하며,
+    스트리밍이 끝나면 추천 도서 제목이 있는 응답만 캐시에 저장합니다.
+
+    Raises:
+        RecommendationError: Gemini API 호출 중 오류 발생 시.
+    """
+    cached = _get_recommendation_cache().get(prompt_hash)
+    if cached is not None:
+        logging.info("캐시된 Gemini 추천 응답을 사용합니다.")
+        yield cached
+        return
+
+    chunks = []
+    try:
+        model = _get_gemini_model(CONFIG["gemini"]["model"])
+        for chunk in model.generate_content(prompt, stream=True):
+            text = _response_text(chunk)
+            chunks.append(text)
+            yield text
+    except Exception as e:
+        logging.exception("Gemini API 스트리밍 호출 중 심각한 오류가 발생했습니다.")
+        raise RecommendationError(f"AI 추천 생성 중 오류가 발생했습니다: {e}")
+
+    logging.info("Gemini로부터 추천 응답을 받았습니다.")
+    _cache_recommendation(prompt_hash, "".join(chunks).strip())
+
+def get_gemini_recommendation(user_query: str, book_list: List[Dict[str, Any]],
+                              stream: bool = False) -> Union[str, Iterator[str]]:
     """
     Gemini API를 호출하여 책 추천사와 제목을 받습니다.
 
+    같은 프롬프트(요청 + 책 목록)에 대한 응답은 프롬프트 해시를 키로 캐시하여 재사용합니다.
+    추천 도서 제목을 파싱할 수 없는 응답은 캐시하지 않습니다.
+
     Args:
         user_query (str): 사용자의 원본 요청.
         book_list (List[Dict[str, Any]]): 알라딘에서 검색된 책 리스트.
+        stream (bool): True이면 응답 텍스트 조각을 생성되는 대로 반환하는 이터레이터를 돌려줍니다.
 
     Returns:
-        str: Gemini가 생성한 추천 텍스트.
+        Union[str, Iterator[str]]: Gemini가 생성한 추천 텍스트 또는 (stream=True일 때) 텍스트 조각 이터레이터.
 
     Raises:
         RecommendationError: Gemini API 호출 중 오류 발생 시.
     """
     logging.info("Gemini에게 책 추천을 요청합니다.")
-    book_list_str = ""
+    parts = []
     for i, book in enumerate(book_list):
-        book_list_str += (
+        parts.append(
             f"\n{i+1}. 제목: {book['title']}\n"
             f"   저자: {book['author']}\n"
             f"   소개: {book['description']}\n"
             f"   별점: {book['star_rating']}\n"
         )
+    book_list_str = "".join(parts)
     
     prompt = CONFIG["gemini"]["prompt"].format(user_query=user_query, book_list_str=book_list_str)
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+    if stream:
+        return _stream_recommendation(prompt_hash, prompt)
+
+    cached = _get_recommendation_cache().get(prompt_hash)
+    if cached is not None:
+        logging.info("캐시된 Gemini 추천 응답을 사용합니다.")
+        return cached
 
     try:
-        model = genai.GenerativeModel(CONFIG["gemini"]["model"])
+        model = _get_gemini_model(CONFIG["gemini"]["model"])
         response = model.generate_content(prompt)
+        result = _response_text(response).strip()
         logging.info("Gemini로부터 추천 응답을 받았습니다.")
-        return response.text.strip()
     except Exception as e:
         logging.exception("Gemini API 호출 중 심각한 오류가 발생했습니다.")
         raise RecommendationError(f"AI 추천 생성 중 오류가 발생했습니다: {e}")
 
+    _cache_recommendation(prompt_hash, result)
+    return result
+
 def parse_recommended_book_title(gemini_response: str) -> Optional[str]:
     """Gemini 응답 텍스트에서 '추천 도서:' 라인을 파싱하여 제목을 추출합니다."""
-    try:
-        for line in gemini_response.splitlines():
-            if line.startswith("추천 도서:"):
-                return line.replace("추천 도서:", "").strip()
-    except Exception:
+    marker = "추천 도서:"
+    # 줄 전체를 나누지 않고, 줄 맨 앞에 있는 표시 문자열의 위치만 찾아 잘라냅니다.
+    if gemini_response.startswith(marker):
+        start = 0
+    else:
+        start = gemini_response.find("\n" + marker)
+        if start < 0:
+            return None
+        start += 1
+    end = gemini_response.find("\n", start)
+    return gemini_response[start + len(marker):end if end >= 0 else None].strip()
+
+_TITLE_NOISE_RE = re.compile(r"[\W_]+")
+
+def _normalize_title(title: str) -> str:
+    """제목 비교를 위해 소문자로 바꾸고 공백·문장부호를 제거합니다."""
+    return _TITLE_NOISE_RE.sub("", title.lower())
+
+def find_recommended_book(recommended_title: str, books: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Gemini가 추천한 제목과 일치하는 책을 검색 결과에서 찾습니다.
+
+    정규화한 제목의 정확한 일치를 먼저 찾고, 없으면 부분 문자열 포함 여부, 마지막으로 유사도 순으로 찾습니다.
+
+    Args:
+        recommended_title (str): Gemini 응답에서 추출한 책 제목.
+        books (List[Dict[str, Any]]): 알라딘에서 검색된 책 리스트.
+
+    Returns:
+        Optional[Dict[str, Any]]: 일치하는 책 정보 딕셔너리 또는 찾지 못한 경우 None.
+    """
+    by_title = {}
+    for book in books:
+        by_title.setdefault(_normalize_title(book['title']), book)
+
+    target = _normalize_title(recommended_title)
+    if not target:
         return None
-    return None
+    if target in by_title:
+        return by_title[target]
+
+    for normalized, book in by_title.items():
+        if normalized and (target in normalized or normalized in target):
+            return book
+
+    close = difflib.get_close_matches(target, list(by_title), n=1, cutoff=0.8)
+    return by_title[close[0]] if close else None
 
 # --- 4. Streamlit UI 헬퍼 및 메인 로직 ---
 
-@st.cache_data
+# 추천 결과 카드용 정적 CSS (페이지 설정 단계에서 배경 CSS와 함께 주입)
+RESULT_CARD_CSS = """
+    <style>
+    .result-container {
+        background-color: rgba(255, 255, 255, 0.9); border-radius: 15px; padding: 25px;
+        box-shadow: 0 6px 12px rgba(0,0,0,0.15); border: 1px solid #eee;
+    }
+    </style>
+"""
+
 def get_base64_of_bin_file(file_path: str) -> str:
-    """로컬 파일을 읽어 Base64 문자열로 변환합니다. (Streamlit 캐시 적용)"""
+    """로컬 파일을 읽어 Base64 문자열로 변환합니다."""
     with open(file_path, 'rb') as f:
         data = f.read()
     return base64.b64encode(data).decode()
 
+@st.cache_resource(show_spinner=False)
+def _bg_css(file_path: str) -> str:
+    """
+    배경 이미지를 포함한 CSS 문자열을 생성합니다. (Streamlit 리소스 캐시 적용)
+
+    수 MB 크기의 문자열이므로, 매 재실행마다 복사본을 역직렬화하는 st.cache_data 대신 같은 객체를 그대로 재사용합니다.
+    """
+    bin_str = get_base64_of_bin_file(file_path)
+    return f'''
+        <style>
+        .stApp {{
+            background-image: url("data:image/jpg;base64,{bin_str}");
+            background-size: cover;
+        }}
+        </style>
+    '''
+
 def set_page_background(file_path: str):
     """지정된 이미지를 웹페이지 배경으로 설정합니다."""
     try:
-        bin_str = get_base64_of_bin_file(file_path)
-        st.markdown(f'''
-            <style>
-            .stApp {{
-                background-image: url("data:image/jpg;base64,{bin_str}");
-                background-size: cover;
-            }}
-            </style>
-        ''', unsafe_allow_html=True)
+        st.markdown(_bg_css(file_path), unsafe_allow_html=True)
     except FileNotFoundError:
         logging.warning(f"배경 이미지 파일 '{file_path}'을 찾을 수 없습니다.")
         st.info("ℹ️ 배경 이미지를 찾을 수 없어 기본 배경으로 표시됩니다.")
@@ -253,15 +592,6 @@ def set_page_background(file_path: str):
 def display_recommendation_card(book_data: Dict[str, Any], gemini_response: str):
     """최종 추천 결과를 카드 형태로สวยงาม하게 표시합니다."""
     st.balloons()
-    st.markdown("""
-        <style>
-        .result-container {
-            background-color: rgba(255, 255, 255, 0.9); border-radius: 15px; padding: 25px;
-            box-shadow: 0 6px 12px rgba(0,0,0,0.15); border: 1px solid #eee;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-
     with st.container():
         st.markdown('<div class="result-container">', unsafe_allow_html=True)
         st.header("✨ 당신을 위한 추천 도서 ✨")
@@ -275,7 +605,9 @@ def display_recommendation_card(book_data: Dict[str, Any], gemini_response: str)
             st.subheader(book_data['title'])
             st.write(f"**✍️ 저자:** {book_data['author']}")
             st.write(f"**⭐ 알라딘 별점:** {book_data['star_rating']}")
-            reason = "\n".join(gemini_response.splitlines()[1:]).replace('추천 이유:', '').strip()
+            first_newline = gemini_response.find("\n")
+            reason = gemini_response[first_newline + 1:] if first_newline >= 0 else ""
+            reason = reason.replace('추천 이유:', '').strip()
             st.markdown(f"**💬 AI의 추천사:** *{reason}*")
 
         with st.expander("📖 책 소개 더 보기"):
@@ -297,19 +629,17 @@ def run_recommendation_workflow(user_query: str):
 
         # 2. Gemini 추천 생성
         progress_bar.progress(33, text="관련 도서를 찾았어요. 이제 가장 좋은 책을 고를게요...")
-        gemini_result = get_gemini_recommendation(user_query, found_books)
+        # 응답이 생성되는 대로 화면에 보여주고, 완성된 텍스트는 결과 카드 표시 전에 지웁니다.
+        stream_area = st.empty()
+        with stream_area.container():
+            gemini_result = st.write_stream(get_gemini_recommendation(user_query, found_books, stream=True)).strip()
+        stream_area.empty()
         recommended_title = parse_recommended_book_title(gemini_result)
         
         # 3. 추천된 책 정보 매칭
         progress_bar.progress(66, text="거의 다 됐어요! 추천 결과를 예쁘게 꾸미는 중...")
-        recommended_book = None
-        if recommended_title:
-            for book in found_books:
-                if recommended_title in book['title'] or book['title'] in recommended_title:
-                    recommended_book = book
-                    break
+        recommended_book = find_recommended_book(recommended_title, found_books) if recommended_title else None
         
-        time.sleep(1)
         progress_bar.progress(100, text="짠! 당신을 위한 책이 도착했어요.")
         
         # 4. 결과 표시
@@ -324,7 +654,6 @@ def run_recommendation_workflow(user_query: str):
         st.error(f"오류가 발생했습니다: {e}")
     finally:
         # 작업 완료 후 프로그레스바 숨기기
-        time.sleep(0.5)
         progress_bar.empty()
 
 def main():
@@ -344,6 +673,7 @@ def main():
 
     # --- UI 렌더링 ---
     set_page_background('background1.jpg')
+    st.markdown(RESULT_CARD_CSS, unsafe_allow_html=True)
     st.title("📚 AI 북 큐레이터")
     st.info(f"Aladin API and Gemini {CONFIG['gemini']['model']}", icon="ℹ️")
     st.markdown("---")